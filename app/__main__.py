@@ -8,7 +8,13 @@ import uvicorn
 def main() -> None:
     port = int(os.getenv("PORT", "8000"))
     reload = os.getenv("RELOAD", "").lower() in ("1", "true", "yes")
-    uvicorn.run("app.main:app", host="0.0.0.0", port=port, reload=reload)
+    # The dashboard polls and holds an SSE stream, so per-request access lines are mostly noise.
+    access_log = os.getenv("ACCESS_LOG", "").lower() in ("1", "true", "yes")
+    # Single worker on purpose: device state, connections and the command queue live in-process.
+    # uvicorn[standard] already brings uvloop and httptools, which the default "auto" picks.
+    uvicorn.run(
+        "app.main:app", host="0.0.0.0", port=port, reload=reload, access_log=access_log
+    )
 
 
 if __name__ == "__main__":
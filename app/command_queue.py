@@ -5,25 +5,53 @@ import collections
 import logging
 import time
 import uuid
-from datetime import datetime
 
-from .core.backend import Command, CommandStatus
-from .core.exceptions import DeviceOfflineError
-from .core.models import Device, DeviceState
+from .core.backend import Command, CommandStatus, DeviceBackend
+from .core.exceptions import DeviceOfflineError, DeviceOperationError
+from .core.models import Device, DeviceInfo, DeviceState
 
 logger = logging.getLogger(__name__)
 
 
+class _DeviceQueue:
+    """Single-consumer FIFO for one device: a deque plus a wake-up event."""
+
+    def __init__(self) -> None:
+        self._items: collections.deque[Command] = collections.deque()
+        self._event = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def put_nowait(self, command: Command) -> None:
+        self._items.append(command)
+        self._event.set()
+
+    async def wait(self) -> None:
+        """Block until at least one command is available."""
+        while not self._items:
+            self._event.clear()
+            await self._event.wait()
+
+    def drain(self) -> list[Command]:
+        """Remove and return every queued command in FIFO order."""
+        items = list(self._items)
+        self._items.clear()
+        return items
+
+
 class CommandQueue:
     """Per-device command queue. Delegates execution to DeviceBackend."""
 
     def __init__(self, devices: dict[str, Device]) -> None:
         self._devices = devices
 
-        self._queues: dict[str, asyncio.Queue[Command]] = {}
-        self._pending: dict[str, collections.deque[Command]] = {}
+        # The device set is fixed for the queue's lifetime, so allocate every FIFO up front.
+        self._queues: dict[str, _DeviceQueue] = {device_id: _DeviceQueue() for device_id in devices}
+        # (device_id, child_id, action) → QUEUED command, for O(1) dedup in submit().
+        self._queued_index: dict[tuple[str, str | None, str], Command] = {}
         self._processors: dict[str, asyncio.Task] = {}
-        self._last_command_time: dict[str, float] = {}
+        self._next_allowed: dict[str, float] = {}  # device_id -> earliest monotonic send time
 
     def submit(self, command: Command) -> Command:
         """Submit a command, returning the canonical Command (may be deduplicated).
@@ -32,26 +60,21 @@ class CommandQueue:
         the existing one is returned so callers share the same completion event.
         """
         device_id = command.device_id
+        queue = self._queues.get(device_id)
+        if queue is None:
+            raise ValueError(f"Device {device_id} not found")
+
+        key = (device_id, command.child_id, command.action)
+        existing = self._queued_index.get(key)
+        if existing is not None and existing.status == CommandStatus.QUEUED:
+            logger.debug(
+                f"Dedup: reusing command {existing.id} for device {device_id} "
+                f"action={command.action} child={command.child_id}"
+            )
+            return existing
 
-        if device_id not in self._queues:
-            self._queues[device_id] = asyncio.Queue()
-            self._pending[device_id] = collections.deque()
-
-        for existing in self._pending[device_id]:
-            if (
-                existing.status == CommandStatus.QUEUED
-                and existing.device_id == device_id
-                and existing.child_id == command.child_id
-                and existing.action == command.action
-            ):
-                logger.debug(
-                    f"Dedup: reusing command {existing.id} for device {device_id} "
-                    f"action={command.action} child={command.child_id}"
-                )
-                return existing
-
-        self._queues[device_id].put_nowait(command)
-        self._pending[device_id].append(command)
+        self._queued_index[key] = command
+        queue.put_nowait(command)
         logger.debug(f"Queued command {command.id} for device {device_id} action={command.action}")
 
         if device_id not in self._processors or self._processors[device_id].done():
@@ -84,16 +107,9 @@ class CommandQueue:
 
     async def _process_queue(self, device_id: str) -> None:
         """Command processing loop for a single device."""
-        if device_id not in self._queues:
-            return
-
+        # submit() only accepts configured devices, so both lookups always hit.
         queue = self._queues[device_id]
-        device = self._devices.get(device_id)
-        if not device:
-            logger.error(f"Processor: unknown device_id {device_id}")
-            self._processors.pop(device_id, None)
-            return
-
+        device = self._devices[device_id]
         cfg = device.info
         backend = device.backend
 
@@ -104,68 +120,109 @@ class CommandQueue:
                 if backend.policy.session_timeout:
                     # Stateful: hold processor open so the backend can reuse its connection.
                     try:
-                        cmd = await asyncio.wait_for(
-                            queue.get(), timeout=backend.policy.session_timeout
+                        await asyncio.wait_for(
+                            queue.wait(), timeout=backend.policy.session_timeout
                         )
                     except asyncio.TimeoutError:
                         logger.debug(f"Processor idle timeout for device {device_id}, exiting")
                         break
-                else:
+                elif not queue:
                     # Stateless: drain queue then exit immediately.
-                    try:
-                        cmd = queue.get_nowait()
-                    except asyncio.QueueEmpty:
-                        break
+                    break
 
-                pending = self._pending.get(device_id)
-                if pending:
-                    try:
-                        pending.remove(cmd)
-                    except ValueError:
-                        pass
-
-                cmd.status = CommandStatus.PROCESSING
-                logger.debug(f"Processing command {cmd.id} for device {device_id} action={cmd.action}")
+                # Wait out the rate limit before draining, so commands submitted meanwhile
+                # join this batch and get coalesced instead of queueing behind it.
                 await self._wait_for_rate_limit(device_id, backend.policy.command_interval)
-
-                if cmd._future is None:
-                    raise RuntimeError(f"Command {cmd.id} has no future attached")
-                try:
-                    state = await backend.execute_command(cmd, cfg)
-                    cmd.status = CommandStatus.COMPLETED
-                    cmd.completed_at = datetime.now()
-                    if not cmd._future.done():
-                        cmd._future.set_result(state)
-                    logger.debug(f"Command {cmd.id} completed for device {device_id}")
-                except DeviceOfflineError as e:
-                    cmd.status = CommandStatus.FAILED
-                    if not cmd._future.done():
-                        cmd._future.set_exception(e)
-                    logger.info(f"Device {device_id} is offline: {e}")
-                except Exception as e:
-                    cmd.status = CommandStatus.FAILED
-                    if not cmd._future.done():
-                        cmd._future.set_exception(e)
-                    logger.error(f"Unexpected error processing command {cmd.id} for device {device_id}: {e}")
+                batch = queue.drain()
+
+                # Collapse the burst to the last action per outlet; re-inserting moves the
+                # key to the end so finals still execute in submission order.
+                final: dict[str | None, Command] = {}
+                superseded: dict[str | None, list[Command]] = collections.defaultdict(list)
+                for item in batch:
+                    item.status = CommandStatus.PROCESSING
+                    self._queued_index.pop((item.device_id, item.child_id, item.action), None)
+                    previous = final.pop(item.child_id, None)
+                    if previous is not None:
+                        superseded[item.child_id].append(previous)
+                    final[item.child_id] = item
+
+                for i, (child_id, final_cmd) in enumerate(final.items()):
+                    if i:
+                        await self._wait_for_rate_limit(
+                            device_id, backend.policy.command_interval
+                        )
+                    await self._run_command(
+                        device_id, final_cmd, superseded.get(child_id, []), backend, cfg
+                    )
 
         finally:
             self._processors.pop(device_id, None)
             logger.debug(f"Processor exited for device {device_id}")
             # Restart if commands arrived while we were winding down.
-            if device_id in self._queues and not self._queues[device_id].empty():
+            if self._queues.get(device_id):
                 logger.debug(f"Commands pending — restarting processor for device {device_id}")
                 self._processors[device_id] = asyncio.create_task(
                     self._process_queue(device_id)
                 )
 
+    async def _run_command(
+        self,
+        device_id: str,
+        cmd: Command,
+        superseded: list[Command],
+        backend: DeviceBackend,
+        cfg: DeviceInfo,
+    ) -> None:
+        """Execute cmd and resolve it together with the commands it superseded."""
+        logger.debug(f"Processing command {cmd.id} for device {device_id} action={cmd.action}")
+        if superseded:
+            logger.debug(
+                f"Coalesced {len(superseded)} command(s) into {cmd.id} for device {device_id}"
+            )
+        commands = [cmd, *superseded]
+        for c in commands:
+            if c._future is None:
+                raise RuntimeError(f"Command {c.id} has no future attached")
+        try:
+            state = await backend.execute_command(cmd, cfg)
+        except DeviceOfflineError as e:
+            self._fail(commands, e)
+            logger.info(f"Device {device_id} is offline: {e}")
+        except DeviceOperationError as e:
+            self._fail(commands, e)
+            logger.warning(f"Command {cmd.id} failed for device {device_id}: {e}")
+        except Exception as e:
+            self._fail(commands, e)
+            logger.error(f"Unexpected error processing command {cmd.id} for device {device_id}: {e}")
+        else:
+            completed_at_ns = time.monotonic_ns()
+            for c in commands:
+                c.status = CommandStatus.COMPLETED
+                c.completed_at_ns = completed_at_ns
+                if not c._future.done():
+                    c._future.set_result(state)
+            elapsed_ms = (completed_at_ns - cmd.created_at_ns) / 1e6
+            logger.debug(
+                f"Command {cmd.id} completed for device {device_id} in {elapsed_ms:.0f} ms"
+            )
+
+    @staticmethod
+    def _fail(commands: list[Command], error: Exception) -> None:
+        for c in commands:
+            c.status = CommandStatus.FAILED
+            if not c._future.done():
+                c._future.set_exception(error)
+
     async def _wait_for_rate_limit(self, device_id: str, interval: float) -> None:
         if not interval:
             return
+        # Reserve the slot before sleeping so nothing that runs during the sleep can claim it.
         now = time.monotonic()
-        elapsed = now - self._last_command_time.get(device_id, 0)
-        if elapsed < interval:
-            await asyncio.sleep(interval - elapsed)
-        self._last_command_time[device_id] = time.monotonic()
+        slot = max(now, self._next_allowed.get(device_id, 0.0))
+        self._next_allowed[device_id] = slot + interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
 
 
 def make_command(
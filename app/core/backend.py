@@ -3,9 +3,9 @@
 from __future__ import annotations
 
 import asyncio
+import time
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
-from datetime import datetime
 from enum import Enum
 from typing import ClassVar, Generic, TypeVar
 
@@ -22,7 +22,7 @@ class CommandStatus(Enum):
     FAILED = "failed"
 
 
-@dataclass
+@dataclass(slots=True)
 class Command:
     """A device control command submitted to the queue."""
 
@@ -31,12 +31,13 @@ class Command:
     action: str  # "on" | "off"
     child_id: str | None = None
     status: CommandStatus = CommandStatus.QUEUED
-    created_at: datetime = field(default_factory=datetime.now)
-    completed_at: datetime | None = None
+    # time.monotonic_ns(): only ever compared with each other, never shown as wall-clock time
+    created_at_ns: int = field(default_factory=time.monotonic_ns)
+    completed_at_ns: int | None = None
     _future: asyncio.Future[DeviceState] | None = field(default=None, init=False, repr=False)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class BackendPolicy:
     """Queue-visible behavioral parameters for a DeviceBackend.
 
@@ -69,8 +70,9 @@ class DeviceBackend(ABC, Generic[_Cfg]):
         Returns None if unreachable or identity mismatch."""
 
     @abstractmethod
-    async def find_ip(self, cfg: _Cfg) -> str | None:
-        """Broadcast to locate this device's current IP. Returns IP or None."""
+    async def find_ip(self, cfg: _Cfg, use_cache: bool = True) -> str | None:
+        """Broadcast to locate this device's current IP. Returns IP or None.
+        use_cache=False ignores remembered results, so the answer comes from a fresh broadcast."""
 
     async def close(self) -> None:
         """Close any open connections on application shutdown."""
@@ -11,23 +11,54 @@ from .utils import mac_to_id, normalize_mac
 
 logger = logging.getLogger(__name__)
 
+
+def load_ip_cache(path: Path) -> dict[str, str]:
+    """Read the persisted MAC -> IP map; empty if missing or unreadable."""
+    try:
+        data = json.loads(path.read_bytes())
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable IP cache {path}: {e}")
+        return {}
+    if not isinstance(data, dict):
+        logger.warning(f"Ignoring IP cache {path}: expected a JSON object")
+        return {}
+    return {mac: ip for mac, ip in data.items() if isinstance(ip, str)}
+
+
+def save_ip_cache(path: Path, ips: dict[str, str]) -> None:
+    """Write the MAC -> IP map, replacing the file atomically."""
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(ips, separators=(",", ":")))
+    tmp.replace(path)
+
+
 class ConfigManager:
     """Loads and manages the configured device list."""
 
     def __init__(self, devices_path: Path) -> None:
         self._devices_path = devices_path
         self._devices: dict[str, DeviceInfo] = {}
+        self._mtime_ns: int | None = None
+        self._size: int | None = None
 
     def load(self) -> dict[str, DeviceInfo]:
-        """Load device config from config/devices.json."""
-        if not self._devices_path.exists():
+        """Load device config from config/devices.json. No-op if the file is unchanged."""
+        try:
+            stat = self._devices_path.stat()
+        except FileNotFoundError:
             logger.warning(f"Device config not found: {self._devices_path}")
             self._devices = {}
+            self._mtime_ns = self._size = None
+            return self._devices
+
+        if self._devices and (stat.st_mtime_ns, stat.st_size) == (self._mtime_ns, self._size):
+            logger.debug(f"Device config unchanged, skipping reload of {self._devices_path}")
             return self._devices
 
         logger.debug(f"Loading device config from {self._devices_path}")
-        with open(self._devices_path) as f:
-            data = json.load(f)
+        data = json.loads(self._devices_path.read_bytes())
 
         if not isinstance(data, dict):
             raise ValueError(
@@ -63,6 +94,7 @@ class ConfigManager:
                 skipped += 1
 
         self._devices = devices
+        self._mtime_ns, self._size = stat.st_mtime_ns, stat.st_size
 
         # summarise load result grouped by device type
         breakdown = ", ".join(
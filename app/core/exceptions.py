@@ -7,3 +7,7 @@ class DeviceOfflineError(Exception):
 
 class DeviceOperationError(Exception):
     """Operation failed but device may still be online."""
+
+
+class DeviceTimeoutError(DeviceOperationError):
+    """Device accepted the request but did not finish it in time."""
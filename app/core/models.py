@@ -18,7 +18,7 @@ class DeviceStatus(Enum):
     OFFLINE = "offline"
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class DeviceInfo:
     """Base class for all device configurations. Protocol-agnostic fields only."""
 
@@ -30,10 +30,11 @@ class DeviceInfo:
 
     def __post_init__(self) -> None:
         if not self.id:
-            self.id = mac_to_id(self.mac)
+            # Frozen after construction; the derived ID is the one field filled in here.
+            object.__setattr__(self, "id", mac_to_id(self.mac))
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ChildState:
     """State of a single child outlet on a power strip."""
 
@@ -42,7 +43,7 @@ class ChildState:
     is_on: bool
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class DeviceState:
     """Immutable snapshot of device-reported state. is_on is None when OFFLINE."""
 
@@ -59,13 +60,17 @@ class DeviceState:
         return self.children is not None
 
 
-@dataclass
+@dataclass(slots=True)
 class Device:
     """Aggregate: per-device config, backend, and current state in one place."""
 
     info: DeviceInfo
     backend: DeviceBackend
     state: DeviceState
+    refreshed_at: float = 0.0  # time.monotonic() of the last ONLINE state; 0 = never
+    # (state, API response built from it, its JSON once serialized), kept by app.schemas.
+    # Lives here so it is dropped with the device instead of outliving its manager.
+    response_cache: tuple[DeviceState, object, str | None] | None = None
 
 
 def make_offline_state(
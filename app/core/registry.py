@@ -3,18 +3,33 @@
 from collections.abc import Awaitable, Callable
 from dataclasses import dataclass
 
-from ..kasa import KasaBackend, KasaDeviceConfig, discover_all as kasa_discover, parse_config as kasa_parse
-from ..miio import MiioBackend, MiioDeviceConfig, discover_all as miio_discover, parse_config as miio_parse
+from ..kasa import (
+    KasaBackend,
+    KasaDeviceConfig,
+    close_discovery as kasa_close,
+    discover_all as kasa_discover,
+    parse_config as kasa_parse,
+)
+from ..miio import (
+    MiioBackend,
+    MiioDeviceConfig,
+    close_discovery as miio_close,
+    discover_all as miio_discover,
+    parse_config as miio_parse,
+)
 from .backend import DeviceBackend
 from .models import DeviceInfo
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ProtocolSpec:
     parser: Callable[[dict, str, str], DeviceInfo]
     backend: Callable[[], DeviceBackend]  # zero-arg factory, one instance per device
-    discover_all: Callable[[dict], Awaitable[dict[str, str]]]
+    # (known_devices, on_found=None) -> MAC -> IP; on_found(mac, ip) fires as devices answer
+    discover_all: Callable[..., Awaitable[dict[str, str]]]
     model: type[DeviceInfo]
+    # Releases protocol-wide resources (sockets, running sweeps) on shutdown
+    close: Callable[[], Awaitable[None]] | None = None
 
 
 # To add a new protocol: import its parser/backend/discover, add one entry here.
@@ -24,11 +39,13 @@ PROTOCOLS: dict[str, ProtocolSpec] = {
         backend=KasaBackend,
         discover_all=kasa_discover,
         model=KasaDeviceConfig,
+        close=kasa_close,
     ),
     "miio": ProtocolSpec(
         parser=miio_parse,
         backend=MiioBackend,
         discover_all=miio_discover,
         model=MiioDeviceConfig,
+        close=miio_close,
     ),
 }
@@ -1,17 +1,36 @@
 """General-purpose utility functions."""
 
+import functools
 import hashlib
+import time
+from datetime import datetime, timezone
 
+# (epoch second, datetime) — one tuple so executor threads never see a torn pair
+_timestamp_cache: tuple[int, datetime] = (0, datetime.fromtimestamp(0, timezone.utc))
+_MAC_SEPARATORS = str.maketrans("", "", "-:.")
 
+
+# Discovery callbacks see the same handful of MACs on every sweep.
+@functools.lru_cache(maxsize=256)
 def normalize_mac(mac: str) -> str:
     """Normalize MAC address to uppercase with colons (AA:BB:CC:DD:EE:FF)."""
-    clean = mac.upper().replace("-", "").replace(":", "").replace(".", "")
+    clean = mac.translate(_MAC_SEPARATORS).upper()
     if len(clean) != 12:
         raise ValueError(f"Invalid MAC address: {mac}")
-    return ":".join(clean[i : i + 2] for i in range(0, 12, 2))
+    return f"{clean[0:2]}:{clean[2:4]}:{clean[4:6]}:{clean[6:8]}:{clean[8:10]}:{clean[10:12]}"
 
 
+@functools.lru_cache(maxsize=256)
 def mac_to_id(mac: str) -> str:
     """Generate a stable 8-char device ID from MAC address (SHA-256)."""
     normalized = normalize_mac(mac)
-    return hashlib.sha256(normalized.encode()).hexdigest()[:8]
+    return hashlib.sha256(normalized.encode()).digest()[:4].hex()
+
+
+def utc_now() -> datetime:
+    """Current UTC time at second resolution, reusing one datetime per wall-clock second."""
+    global _timestamp_cache
+    second = int(time.time())
+    if second != _timestamp_cache[0]:
+        _timestamp_cache = (second, datetime.fromtimestamp(second, timezone.utc))
+    return _timestamp_cache[1]
@@ -3,11 +3,14 @@
 import asyncio
 import contextlib
 import logging
+import random
+import time
+from collections import defaultdict
 from pathlib import Path
 from typing import Literal
 
 from .command_queue import CommandQueue, make_command
-from .core.config import ConfigManager
+from .core.config import ConfigManager, load_ip_cache, save_ip_cache
 from .core.exceptions import DeviceOfflineError, DeviceOperationError
 from .core.models import Device, DeviceState, DeviceStatus, make_offline_state
 from .core.registry import PROTOCOLS
@@ -15,53 +18,81 @@ from .core.registry import PROTOCOLS
 logger = logging.getLogger(__name__)
 
 POLL_INTERVAL: float = 60.0  # seconds between polling cycles
+POLL_CONCURRENCY: int = 16  # default max devices probed at once
+PROBE_TIMEOUT: float = 15.0  # per-device deadline so one hung device cannot stall a cycle
+POLL_BACKOFF_MAX: float = 900.0  # cap on the doubling delay between polls of an unreachable device
+IP_CACHE_SAVE_DELAY: float = 1.0  # coalesces IP changes from a discovery burst into one write
+DISCOVERY_INTERVAL: float = 300.0  # seconds between broadcasts for devices still offline
+DISCOVERY_INTERVAL_MAX: float = 1800.0  # cap while the same devices stay missing
+STATUS_TTL: float = 5.0  # cached state older than this is refreshed in the background on read
 
 
 class DeviceManager:
     """Manages all devices: config, backends, state cache, and polling."""
 
     DEFAULT_DEVICES_PATH = Path(__file__).parent.parent / "config" / "devices.json"
+    DEFAULT_IP_CACHE_PATH = Path(__file__).parent.parent / "config" / "ip_cache.json"
 
-    def __init__(self, devices_path: Path | None = None) -> None:
+    def __init__(
+        self,
+        devices_path: Path | None = None,
+        ip_cache_path: Path | None = None,
+        probe_concurrency: int = POLL_CONCURRENCY,
+    ) -> None:
         self._config = ConfigManager(devices_path or self.DEFAULT_DEVICES_PATH)
+        self._ip_cache_path = ip_cache_path or self.DEFAULT_IP_CACHE_PATH
         self._devices: dict[str, Device] = {}
+        # The device set is fixed after initialize(); Device objects are mutated in place,
+        # so this snapshot always reflects current state.
+        self._device_list: tuple[Device, ...] = ()
         self._queue: CommandQueue | None = None
         self._poll_task: asyncio.Task | None = None
+        self._discovery_task: asyncio.Task | None = None
         self._subscribers: set[asyncio.Queue] = set()
+        self._state_version = 0  # bumped on every state write, for response caching
+        self._notify_scheduled = False
+        self._probe_limit = asyncio.Semaphore(probe_concurrency)
+        self._revalidating: dict[str, asyncio.Task] = {}
+        self._refreshing: dict[str, asyncio.Task[DeviceState]] = {}
+        # device_id -> (consecutive failed polls, monotonic time before which polls are skipped)
+        self._poll_backoff: dict[str, tuple[int, float]] = {}
+        self._saved_ips: dict[str, str] = {}  # MAC -> IP as last written to the IP cache
+        self._ip_save_task: asyncio.Task | None = None
 
     async def initialize(self) -> None:
-        """Load config → discover → build Device aggregates → probe initial state → start polling."""
-        self._config.load()
-
-        for type_name, spec in PROTOCOLS.items():
-            sub_devices = {
-                info.mac: info
-                for info in self._config.devices.values()
-                if isinstance(info, spec.model)
-            }
-            if not sub_devices:
-                continue
-
-            logger.info(f"Discovering {type_name} devices ({len(sub_devices)} configured)...")
-            ip_map = await spec.discover_all(sub_devices)
-
-            for cfg in sub_devices.values():
-                backend = spec.backend()
-                backend.ip = ip_map.get(cfg.mac)
-
-                try:
-                    state = (
-                        await backend.fetch_state(cfg, backend.ip) if backend.ip else None
-                    ) or make_offline_state(cfg.id)
-                except Exception as e:
-                    logger.warning(f"Failed to probe {cfg.name} during init: {e}")
-                    state = make_offline_state(cfg.id)
-
-                self._devices[cfg.id] = Device(info=cfg, backend=backend, state=state)
-                self._log_status_change(cfg.name, None, state)
+        """Load config → probe last known IPs → start polling → discover the rest in background."""
+        # Keep file I/O off the event loop so a slow disk cannot stall other tasks.
+        await asyncio.to_thread(self._config.load)
+        persisted_ips = await asyncio.to_thread(load_ip_cache, self._ip_cache_path)
+        self._saved_ips = persisted_ips
+
+        # Config file order, so listings are a straight walk of _devices.
+        self._devices = {
+            info.id: Device(
+                info=info, backend=PROTOCOLS[info.type].backend(), state=make_offline_state(info.id)
+            )
+            for info in self._config.devices.values()
+        }
+        self._device_list = tuple(self._devices.values())
+
+        # Devices rarely change IP between restarts; a direct probe answers in one RTT
+        # while a broadcast always waits out its full timeout.
+        await asyncio.gather(
+            *(
+                self._probe_initial(device, persisted_ips[device.info.mac])
+                for device in self._devices.values()
+                if device.info.mac in persisted_ips
+            )
+        )
+        for device in self._devices.values():
+            if device.state.status != DeviceStatus.ONLINE:
+                self._log_status_change(device.info.name, None, device.state)
 
         self._queue = CommandQueue(devices=self._devices)
         self._poll_task = asyncio.create_task(self._polling_loop())
+        # The API serves cached state immediately; devices found by broadcast are
+        # published to subscribers as they come online.
+        self._discovery_task = asyncio.create_task(self._discovery_loop())
 
         online = sum(1 for d in self._devices.values() if d.state.status == DeviceStatus.ONLINE)
         total = len(self._devices)
@@ -75,19 +106,43 @@ class DeviceManager:
                 await self._poll_task
             logger.info("Polling stopped")
 
+        if self._discovery_task:
+            self._discovery_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._discovery_task
+
         if self._queue:
             await self._queue.shutdown()
 
-        for device in self._devices.values():
-            await device.backend.close()
-
+        # Awaited before the backends close so no cancelled probe is still unwinding inside
+        # fetch_state/connect when its connection is torn down.
+        tasks = [*self._revalidating.values(), *self._refreshing.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        # Disconnects can each take up to a connection timeout; close them side by side.
+        await asyncio.gather(
+            *(device.backend.close() for device in self._devices.values()),
+            return_exceptions=True,
+        )
+
+        for spec in PROTOCOLS.values():
+            if spec.close:
+                await spec.close()
         logger.info("All backend connections closed")
 
+        if self._ip_save_task:
+            # Cancelling could abandon a write mid-flight in its thread; let it finish.
+            await self._ip_save_task
+        await self._save_ips()
+
     async def set_device_power(
         self, device_id: str, action: Literal["on", "off"], child_id: str | None = None
     ) -> DeviceState:
         """Submit command to queue, wait for completion, update state cache."""
-        if device_id not in self._devices:
+        device = self._devices.get(device_id)
+        if device is None:
             raise ValueError(f"Device {device_id} not found")
         if not self._queue:
             raise RuntimeError("Device manager not initialized")
@@ -97,7 +152,7 @@ class DeviceManager:
         try:
             state = await self._queue.wait_for_command(cmd)
         except DeviceOfflineError:
-            self._update_state(device_id, make_offline_state(device_id, self._devices[device_id].state))
+            self._update_state(device_id, make_offline_state(device_id, device.state))
             raise
         self._update_state(device_id, state)
         return state
@@ -108,39 +163,35 @@ class DeviceManager:
         if not device:
             raise ValueError(f"Device {device_id} not found")
 
-        if device.backend.ip:
-            logger.info(f"Refreshing {device.info.name} at cached IP {device.backend.ip}")
-            state = await device.backend.fetch_state(device.info, device.backend.ip)
-            if state:
-                self._update_state(device_id, state)
-                return state
-
-        logger.info(f"Cached IP unreachable for {device.info.name}, rediscovering...")
-        new_ip = await device.backend.find_ip(device.info)
-        if new_ip:
-            state = await device.backend.fetch_state(device.info, new_ip)
-            if state:
-                self._update_state(device_id, state)
-                return state
+        # Concurrent refreshes of one device share a single probe; parallel connects to
+        # the same plug tend to be refused and would report it offline.
+        task = self._refreshing.get(device_id)
+        if task is None:
+            task = asyncio.create_task(self._refresh(device_id, device))
+            self._refreshing[device_id] = task
+            task.add_done_callback(lambda _: self._refreshing.pop(device_id, None))
+        return await asyncio.shield(task)
 
-        logger.warning(f"Could not reach {device.info.name} during refresh")
-        state = make_offline_state(device_id, device.state)
-        self._update_state(device_id, state)
-        return state
-
-    def get_all_devices(self) -> list[Device]:
+    def get_all_devices(self) -> tuple[Device, ...]:
         """Get all Device aggregates in config file order."""
-        return [
-            self._devices[info.id]
-            for info in self._config.devices.values()
-            if info.id in self._devices
-        ]
+        return self._device_list
+
+    @property
+    def state_version(self) -> int:
+        """Counter that changes whenever any device's state is written."""
+        return self._state_version
 
-    def get_device(self, device_id: str) -> Device:
-        """Get a single Device aggregate."""
+    def get_device(self, device_id: str, revalidate: bool = False) -> Device:
+        """Get a single Device aggregate; with revalidate, refresh stale state in the background."""
         device = self._devices.get(device_id)
         if device is None:
             raise ValueError(f"Device {device_id} not found")
+        if revalidate and device_id not in self._revalidating:
+            if not self._is_fresh(device, STATUS_TTL):
+                # Serve the cached state now; subscribers get the fresh one when it lands.
+                task = asyncio.create_task(self._poll_device(device_id, device))
+                self._revalidating[device_id] = task
+                task.add_done_callback(lambda _: self._revalidating.pop(device_id, None))
         return device
 
     # ── Internal ──────────────────────────────────────────────────────────────
@@ -158,7 +209,44 @@ class DeviceManager:
         device = self._devices[device_id]
         previous = device.state
         device.state = new_state
+        self._state_version += 1
+        if new_state.status == DeviceStatus.ONLINE:
+            device.refreshed_at = time.monotonic()
+            self._poll_backoff.pop(device_id, None)
+            # Persist new addresses as they are learned, so a crash or power cut does not
+            # send the next startup back to broadcast discovery.
+            ip = device.backend.ip
+            if ip and self._saved_ips.get(device.info.mac) != ip:
+                self._schedule_ip_save()
         self._log_status_change(device.info.name, previous, new_state)
+        # Updates landing in the same loop iteration (coalesced commands, a polling
+        # burst) share one notification per subscriber.
+        if not self._notify_scheduled:
+            self._notify_scheduled = True
+            asyncio.get_running_loop().call_soon(self._notify_subscribers)
+
+    def _schedule_ip_save(self) -> None:
+        if self._ip_save_task is None or self._ip_save_task.done():
+            self._ip_save_task = asyncio.create_task(self._save_ips_later())
+
+    async def _save_ips_later(self) -> None:
+        await asyncio.sleep(IP_CACHE_SAVE_DELAY)
+        await self._save_ips()
+
+    async def _save_ips(self) -> None:
+        """Write every device's current IP to the IP cache, if any changed."""
+        ips = {d.info.mac: d.backend.ip for d in self._devices.values() if d.backend.ip}
+        if ips == self._saved_ips:
+            return
+        try:
+            await asyncio.to_thread(save_ip_cache, self._ip_cache_path, ips)
+        except OSError as e:
+            logger.warning(f"Could not persist IP cache to {self._ip_cache_path}: {e}")
+            return
+        self._saved_ips = ips
+
+    def _notify_subscribers(self) -> None:
+        self._notify_scheduled = False
         for q in self._subscribers:
             try:
                 q.put_nowait(None)
@@ -175,29 +263,175 @@ class DeviceManager:
             else:
                 logger.info(f"{name} is now offline")
 
+    async def _refresh(self, device_id: str, device: Device) -> DeviceState:
+        # Start rediscovery alongside the cached-IP probe so a stale IP costs
+        # max(probe, broadcast) instead of their sum. It must bypass the discovery cache:
+        # started before the probe fails, a cached lookup would just return the same
+        # stale IP that background sweeps keep re-caching.
+        discovery = asyncio.create_task(device.backend.find_ip(device.info, use_cache=False))
+        try:
+            if device.backend.ip:
+                logger.info(f"Refreshing {device.info.name} at cached IP {device.backend.ip}")
+                state = await device.backend.fetch_state(device.info, device.backend.ip)
+                if state:
+                    self._update_state(device_id, state)
+                    return state
+                logger.info(f"Cached IP unreachable for {device.info.name}, rediscovering...")
+            new_ip = await discovery
+        finally:
+            discovery.cancel()
+
+        if new_ip:
+            state = await device.backend.fetch_state(device.info, new_ip)
+            if state:
+                self._update_state(device_id, state)
+                return state
+
+        logger.warning(f"Could not reach {device.info.name} during refresh")
+        state = make_offline_state(device_id, device.state)
+        self._update_state(device_id, state)
+        return state
+
+    @staticmethod
+    def _is_fresh(device: Device, max_age: float) -> bool:
+        """True if device is online and its state was read less than max_age seconds ago."""
+        # Monotonic, so wall-clock jumps (NTP sync on boot) cannot make state look fresh.
+        return (
+            device.state.status == DeviceStatus.ONLINE
+            and time.monotonic() - device.refreshed_at < max_age
+        )
+
+    async def _discovery_loop(self) -> None:
+        """Broadcast for offline devices now, then periodically while any stay offline."""
+        # Polling only re-probes known IPs, so a device that was unplugged at startup or
+        # came back on a new DHCP lease is only ever found by a broadcast.
+        interval = DISCOVERY_INTERVAL
+        previously_missing: set[str] = set()
+        while True:
+            missing = {
+                device_id
+                for device_id, device in self._devices.items()
+                if device.state.status != DeviceStatus.ONLINE
+            }
+            # The same devices missing sweep after sweep are most likely unplugged, so
+            # broadcast less often; any change in the set resets to the base interval.
+            if missing and missing == previously_missing:
+                interval = min(interval * 1.5, DISCOVERY_INTERVAL_MAX)
+            else:
+                interval = DISCOVERY_INTERVAL
+            previously_missing = missing
+            try:
+                await self._discover_missing()
+            except Exception:
+                logger.exception("Background discovery failed")
+            await asyncio.sleep(interval)
+
+    async def _discover_missing(self) -> None:
+        """Broadcast for devices that did not answer at a known IP, all protocols side by side."""
+        missing: dict[str, dict[str, Device]] = defaultdict(dict)
+        for device in self._devices.values():
+            if device.state.status != DeviceStatus.ONLINE:
+                missing[device.info.type][device.info.mac] = device
+        if not missing:
+            logger.debug("All devices online, skipping discovery")
+            return
+
+        await asyncio.gather(
+            *(self._discover_protocol(type_name, devices) for type_name, devices in missing.items())
+        )
+
+    async def _discover_protocol(self, type_name: str, missing: dict[str, Device]) -> None:
+        logger.info(f"Discovering {type_name} devices ({len(missing)} not at a known IP)...")
+        probes: list[asyncio.Task] = []
+
+        # Probe each device as soon as it answers instead of after the sweep times out.
+        def on_found(mac: str, ip: str) -> None:
+            device = missing[mac]
+            device.backend.ip = ip
+            probes.append(asyncio.create_task(self._probe_initial(device, ip)))
+
+        try:
+            await PROTOCOLS[type_name].discover_all(
+                {mac: device.info for mac, device in missing.items()}, on_found=on_found
+            )
+            await asyncio.gather(*probes)
+        finally:
+            for probe in probes:
+                probe.cancel()
+
+    async def _probe_initial(self, device: Device, ip: str) -> None:
+        """Read device's state at ip; fetch_state adopts ip as backend.ip if it answers."""
+        async with self._probe_limit:
+            try:
+                async with asyncio.timeout(PROBE_TIMEOUT):
+                    state = await device.backend.fetch_state(device.info, ip)
+            except TimeoutError:
+                logger.warning(f"Probe of {device.info.name} at {ip} timed out")
+                return
+            except Exception as e:
+                logger.warning(f"Failed to probe {device.info.name} at {ip}: {e}")
+                return
+        if state:
+            self._update_state(device.info.id, state)
+
     async def _polling_loop(self) -> None:
         """Periodically poll each device to keep the state cache fresh."""
         logger.debug(f"Polling started (interval={POLL_INTERVAL}s)")
         while True:
             await asyncio.sleep(POLL_INTERVAL)
             logger.debug("Polling cycle starting")
+            # Probes are I/O bound; running them together makes a cycle cost the slowest
+            # device rather than the sum over all of them.
+            await asyncio.gather(
+                *(
+                    self._poll_device(device_id, device, skip_if_fresh=POLL_INTERVAL / 2)
+                    for device_id, device in self._devices.items()
+                )
+            )
+            logger.debug("Polling cycle complete")
 
-            for device_id, device in self._devices.items():
-                if self._queue and self._queue.has_active_processor(device_id):
-                    logger.debug(f"Polling skipping {device.info.name} — processor active")
-                    continue
-                if not device.backend.ip:
-                    logger.debug(f"Polling skipping {device.info.name} — no known IP")
-                    continue
-
-                try:
+    async def _poll_device(
+        self, device_id: str, device: Device, skip_if_fresh: float | None = None
+    ) -> None:
+        # Commands and refreshes write the device's state as they complete; a poll right
+        # after one would only read the same state back.
+        if skip_if_fresh is not None and self._is_fresh(device, skip_if_fresh):
+            logger.debug(f"Polling skipping {device.info.name} — updated recently")
+            return
+        if self._queue and self._queue.has_active_processor(device_id):
+            logger.debug(f"Polling skipping {device.info.name} — processor active")
+            return
+        if not device.backend.ip:
+            logger.debug(f"Polling skipping {device.info.name} — no known IP")
+            return
+        backoff = self._poll_backoff.get(device_id)
+        if backoff and time.monotonic() < backoff[1]:
+            logger.debug(f"Polling skipping {device.info.name} — backing off after failures")
+            return
+
+        state: DeviceState | None = None
+        async with self._probe_limit:
+            try:
+                async with asyncio.timeout(PROBE_TIMEOUT):
                     state = await device.backend.fetch_state(device.info, device.backend.ip)
-                    self._update_state(device_id, state or make_offline_state(device_id, device.state))
-                except (DeviceOfflineError, DeviceOperationError, asyncio.TimeoutError, OSError) as e:
-                    logger.warning(f"Polling probe failed for {device.info.name}: {e}")
-                    self._update_state(device_id, make_offline_state(device_id, device.state))
-                except Exception:
-                    logger.exception(f"Unexpected error polling {device.info.name}")
-                    self._update_state(device_id, make_offline_state(device_id, device.state))
+            except TimeoutError:
+                logger.warning(
+                    f"Polling probe for {device.info.name} timed out after {PROBE_TIMEOUT:.0f}s"
+                )
+            except (DeviceOfflineError, DeviceOperationError, OSError) as e:
+                logger.warning(f"Polling probe failed for {device.info.name}: {e}")
+            except Exception:
+                logger.exception(f"Unexpected error polling {device.info.name}")
+        if state is None:
+            self._back_off_polling(device_id)
+            state = make_offline_state(device_id, device.state)
+        self._update_state(device_id, state)
 
-            logger.debug("Polling cycle complete")
+    def _back_off_polling(self, device_id: str) -> None:
+        """Double the wait before device_id is polled again, with jitter, up to POLL_BACKOFF_MAX."""
+        # A blip delays the next probe by about one cycle; a long-dead plug settles at one
+        # probe per POLL_BACKOFF_MAX. Jitter keeps devices lost together out of lockstep.
+        failures = self._poll_backoff.get(device_id, (0, 0.0))[0] + 1
+        delay = min(POLL_BACKOFF_MAX, POLL_INTERVAL * 2 ** (failures - 1))
+        delay *= random.uniform(0.8, 1.2)
+        self._poll_backoff[device_id] = (failures, time.monotonic() + delay)
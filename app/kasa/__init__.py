@@ -2,4 +2,4 @@
 
 from .backend import KasaBackend
 from .config import KasaDeviceConfig, parse_config
-from .connection import discover_all
+from .connection import close_discovery, discover_all
@@ -1,23 +1,39 @@
 """Kasa protocol backend with persistent TCP connection and self-managed session timer."""
 
 import asyncio
+import contextlib
 import logging
+import weakref
 
 from kasa import Device
 
 from ..core.backend import BackendPolicy, Command, DeviceBackend
-from ..core.exceptions import DeviceOfflineError
+from ..core.exceptions import DeviceOfflineError, DeviceTimeoutError
 from ..core.models import DeviceState
 from .config import KasaDeviceConfig
 from ..core.utils import normalize_mac
 from .connection import (
+    PREFLIGHT_TIMEOUT,
     build_device_state,
     connect_device,
     discover_device_ip,
+    invalidate_discovery,
+    is_reachable,
 )
 
 logger = logging.getLogger(__name__)
 
+# Per-connection child_id -> child map; entries vanish with the Device they index.
+_child_index: weakref.WeakKeyDictionary[Device, dict[str, Device]] = weakref.WeakKeyDictionary()
+
+
+def _children_by_id(device: Device) -> dict[str, Device]:
+    children = _child_index.get(device)
+    if children is None:
+        children = {child.device_id: child for child in device.children}
+        _child_index[device] = children
+    return children
+
 
 class KasaBackend(DeviceBackend[KasaDeviceConfig]):
     """Kasa backend: persistent TCP connection, self-managed idle timer."""
@@ -37,7 +53,11 @@ class KasaBackend(DeviceBackend[KasaDeviceConfig]):
             return await asyncio.wait_for(self._run_command(cmd, cfg), timeout=self.policy.command_timeout or None)
         except asyncio.TimeoutError:
             await self._close_connection()
-            raise DeviceOfflineError(f"{cfg.name} did not respond within {self.policy.command_timeout:.0f}s")
+            # Not DeviceOfflineError: the plug may have applied the command and only the reply
+            # was slow, so its state is unknown rather than confirmed offline.
+            raise DeviceTimeoutError(
+                f"{cfg.name} did not respond within {self.policy.command_timeout:.0f}s"
+            )
         except asyncio.CancelledError:
             await self._close_connection()
             raise
@@ -85,11 +105,25 @@ class KasaBackend(DeviceBackend[KasaDeviceConfig]):
         raise DeviceOfflineError(f"{cfg.name} is offline — use refresh to rediscover")
 
     async def fetch_state(self, cfg: KasaDeviceConfig, ip: str) -> DeviceState | None:
-        """One-shot: connect, verify MAC, read state, disconnect."""
+        """Read state over the idle session connection if one is open, else connect one-shot."""
+        conn = self._checkout(ip)
+        if conn is not None:
+            try:
+                await conn.update()
+            except Exception as e:
+                logger.debug(f"Session connection to {cfg.name} failed on update: {e}")
+                await self._safe_disconnect(conn)
+            else:
+                state = build_device_state(cfg, conn)
+                await self._checkin(conn, cfg.name)
+                logger.debug(f"State fetched for {cfg.name} over session connection")
+                return state
+
         logger.debug(f"Fetching state for {cfg.name} at {ip}")
-        device, error = await connect_device(ip, cfg.credentials)
+        device, error = await connect_device(ip, cfg.credentials, cfg.mac)
         if not device:
             logger.warning(f"Cannot reach {cfg.name} at {ip}: {error}")
+            invalidate_discovery(cfg.mac)
             return None
         try:
             if not self._mac_matches(device, cfg.mac, cfg.name):
@@ -101,10 +135,10 @@ class KasaBackend(DeviceBackend[KasaDeviceConfig]):
         finally:
             await self._safe_disconnect(device)
 
-    async def find_ip(self, cfg: KasaDeviceConfig) -> str | None:
+    async def find_ip(self, cfg: KasaDeviceConfig, use_cache: bool = True) -> str | None:
         """Broadcast to locate this device's current IP."""
         logger.debug(f"Broadcasting to find {cfg.name} ({cfg.mac})")
-        ip = await discover_device_ip(cfg)
+        ip = await discover_device_ip(cfg, last_ip=self.ip, use_cache=use_cache)
         if ip:
             self.ip = ip
             logger.info(f"Discovered {cfg.name} at {ip}")
@@ -124,9 +158,19 @@ class KasaBackend(DeviceBackend[KasaDeviceConfig]):
         self, ip: str, cfg: KasaDeviceConfig
     ) -> Device | None:
         """Connect to ip and verify MAC. Returns device on success, None otherwise."""
-        device, error = await connect_device(ip, cfg.credentials)
+        # Only this cached-IP reconnect is preflighted: it is the path where the plug may
+        # have moved, and elsewhere the port check would add a round trip and two extra
+        # connections to firmware that handles few at once.
+        if not await is_reachable(ip):
+            logger.debug(
+                f"Preflight: no Kasa port open on {ip} within {PREFLIGHT_TIMEOUT:.0f}s"
+            )
+            invalidate_discovery(cfg.mac)
+            return None
+        device, error = await connect_device(ip, cfg.credentials, cfg.mac)
         if not device:
             logger.debug(f"Connection to {cfg.name} at {ip} failed: {error}")
+            invalidate_discovery(cfg.mac)
             return None
         if not self._mac_matches(device, cfg.mac, cfg.name):
             await self._safe_disconnect(device)
@@ -148,6 +192,25 @@ class KasaBackend(DeviceBackend[KasaDeviceConfig]):
             return False
         return True
 
+    def _checkout(self, ip: str) -> Device | None:
+        """Take the idle session connection to ip, if any, so a command cannot share it."""
+        conn = self._connection
+        if conn is None or conn.host != ip:
+            return None
+        if self._close_task and not self._close_task.done():
+            self._close_task.cancel()
+            self._close_task = None
+        self._connection = None
+        return conn
+
+    async def _checkin(self, conn: Device, device_name: str) -> None:
+        """Return a checked-out connection, unless a command opened a new one meanwhile."""
+        if self._connection is not None:
+            await self._safe_disconnect(conn)
+            return
+        self._connection = conn
+        self._reset_close_timer(device_name)
+
     def _reset_close_timer(self, device_name: str) -> None:
         if self._close_task and not self._close_task.done():
             self._close_task.cancel()
@@ -157,12 +220,10 @@ class KasaBackend(DeviceBackend[KasaDeviceConfig]):
             )
 
     async def _idle_close(self, device_name: str) -> None:
-        try:
+        with contextlib.suppress(asyncio.CancelledError):
             await asyncio.sleep(self.policy.session_timeout)
             logger.info(f"Session idle for {self.policy.session_timeout}s — closing connection to {device_name}")
             await self._close_connection()
-        except asyncio.CancelledError:
-            pass
 
     async def _close_connection(self) -> None:
         if self._connection:
@@ -171,22 +232,19 @@ class KasaBackend(DeviceBackend[KasaDeviceConfig]):
 
     @staticmethod
     async def _safe_disconnect(device: Device) -> None:
-        try:
+        with contextlib.suppress(Exception):
             await device.disconnect()
-        except Exception:
-            pass
 
     async def _execute_action(self, device: Device, cmd: Command) -> None:
         target = device
         if cmd.child_id:
-            for child in device.children:
-                if child.device_id == cmd.child_id:
-                    target = child
-                    break
-            else:
+            target = _children_by_id(device).get(cmd.child_id)
+            if target is None:
                 raise ValueError(f"Child outlet {cmd.child_id} not found on {device.host}")
 
-        if cmd.action == "on":
-            await target.turn_on()
-        else:
-            await target.turn_off()
+        actions = {"on": target.turn_on, "off": target.turn_off}
+        try:
+            action = actions[cmd.action]
+        except KeyError:
+            raise ValueError(f"Unsupported action {cmd.action!r}") from None
+        await action()
@@ -7,7 +7,7 @@ from kasa import Credentials
 from ..core.models import DeviceInfo
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class KasaDeviceConfig(DeviceInfo):
     """Kasa protocol-specific configuration."""
 
@@ -15,7 +15,8 @@ class KasaDeviceConfig(DeviceInfo):
     credentials: Credentials | None = None
 
     def __post_init__(self) -> None:
-        super().__post_init__()
+        # slots=True rebuilds the class, which breaks zero-argument super().
+        DeviceInfo.__post_init__(self)
         if not self.broadcast:
             raise ValueError(f"KasaDeviceConfig '{self.name}' missing required 'broadcast' field")
 
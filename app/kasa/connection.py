@@ -1,52 +1,115 @@
 """Stateless Kasa network functions: connect, discover, build state."""
 
 import asyncio
+import contextlib
 import logging
-from datetime import datetime, timezone
+import operator
+import time
+from collections import defaultdict
+from collections.abc import Callable
 
 from kasa import Credentials, Device, DeviceConfig, Discover
-from kasa.exceptions import AuthenticationError
+from kasa.exceptions import AuthenticationError, KasaException, UnsupportedDeviceError
 
 from ..core.models import ChildState, DeviceState, DeviceStatus
 from .config import KasaDeviceConfig
-from ..core.utils import normalize_mac
+from ..core.utils import normalize_mac, utc_now
 
 logger = logging.getLogger(__name__)
 
 CONNECTION_TIMEOUT = 10
 CONNECTION_RETRIES = 3
-RETRY_DELAY = 0.5
+RETRY_DELAY = 0.25  # doubled after each failed attempt
+DISCOVERY_POSITIVE_TTL = 300.0  # seconds to trust a discovered IP
+DISCOVERY_NEGATIVE_TTL = 5.0  # short, so a rebooting device is found again quickly
+PREFLIGHT_TIMEOUT = 1.0
+DISCOVERY_ATTEMPTS = 3  # broadcast replies are UDP and get dropped; re-sweep for the missing
+UNICAST_TIMEOUT = 1  # discover_single takes whole seconds
+KASA_PORTS = (9999, 80)  # legacy XOR protocol, KLAP/AES over HTTP
+
+# MAC -> (IP or None when not found, time.monotonic() when stored)
+_discovery_cache: dict[str, tuple[str | None, float]] = {}
+# Broadcast target -> sweep in progress, shared by concurrent discovery callers
+_inflight: dict[str, asyncio.Task[dict[str, str]]] = {}
+# Broadcast target -> callbacks told (mac, ip) as responses arrive during its sweep
+_listeners: dict[str, list[Callable[[str, str], None]]] = defaultdict(list)
+# MACs of devices that rejected an unauthenticated connection; skip straight to credentials.
+# Keyed by MAC, not IP, so a DHCP reassignment cannot carry the flag over to another device.
+_auth_required: set[str] = set()
+
+# Field order must match ChildState(id, alias, is_on).
+_child_fields = operator.attrgetter("device_id", "alias", "is_on")
+
+
+async def _port_open(ip: str, port: int) -> bool:
+    try:
+        _, writer = await asyncio.wait_for(
+            asyncio.open_connection(ip, port), timeout=PREFLIGHT_TIMEOUT
+        )
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    with contextlib.suppress(OSError):
+        await writer.wait_closed()
+    return True
+
+
+async def is_reachable(ip: str) -> bool:
+    """Quick TCP check so a moved or powered-off device fails in ~1s, not the full retry loop."""
+    results = await asyncio.gather(*(_port_open(ip, port) for port in KASA_PORTS))
+    return any(results)
+
+
+def _is_transient(error: Exception) -> bool:
+    """True for network trouble or a slow device; rejected credentials won't pass on a retry."""
+    if isinstance(error, (AuthenticationError, UnsupportedDeviceError)):
+        return False
+    # kasa.exceptions.TimeoutError subclasses the builtin TimeoutError.
+    return isinstance(error, (OSError, TimeoutError, KasaException))
 
 
 async def connect_device(
-    ip: str, credentials: Credentials | None = None
+    ip: str, credentials: Credentials | None = None, mac: str | None = None
 ) -> tuple[Device | None, str | None]:
-    """Attempt connection without credentials first, then with credentials if auth is required."""
-    last_error: str | None = None
+    """Attempt connection without credentials first, then with credentials if auth is required.
+
+    mac identifies the expected device, so a credentials requirement can be remembered for it.
+    """
+    # Device.connect() runs the initial update() itself, so returned devices already
+    # carry fresh state and callers must not update() again.
+    # Kept as the exception and formatted once on return; most attempts are superseded.
+    last_error: Exception | None = None
 
-    logger.debug(f"Connecting to {ip} without credentials...")
+    if credentials is None:
+        probe_attempts = CONNECTION_RETRIES
+    elif mac in _auth_required:
+        probe_attempts = 0
+    else:
+        # One unauthenticated try is enough to learn whether the credentials are needed.
+        probe_attempts = 1
+
+    if probe_attempts:
+        logger.debug(f"Connecting to {ip} without credentials...")
     config_no_auth = DeviceConfig(host=ip, credentials=None, timeout=CONNECTION_TIMEOUT)
 
-    for attempt in range(CONNECTION_RETRIES):
-        device = None
+    for attempt in range(probe_attempts):
         try:
             device = await Device.connect(config=config_no_auth)
-            await device.update()
             logger.debug(f"Connected to {ip} without credentials")
             return device, None
         except AuthenticationError as e:
-            if device:
-                await device.disconnect()
             logger.debug(f"Device at {ip} requires authentication")
-            last_error = f"{type(e).__name__}: {e}"
+            if mac is not None:
+                _auth_required.add(mac)
+            last_error = e
             break
         except Exception as e:
-            if device:
-                await device.disconnect()
-            last_error = f"{type(e).__name__}: {e}"
-            if attempt < CONNECTION_RETRIES - 1:
+            last_error = e
+            if not _is_transient(e):
+                break
+            if attempt < probe_attempts - 1:
                 logger.debug(f"Connection to {ip} failed (attempt {attempt + 1}): {e}")
-                await asyncio.sleep(RETRY_DELAY)
+                await asyncio.sleep(RETRY_DELAY * 2**attempt)
 
     if credentials:
         logger.debug(f"Connecting to {ip} with credentials...")
@@ -55,79 +118,216 @@ async def connect_device(
         )
 
         for attempt in range(CONNECTION_RETRIES):
-            device = None
             try:
                 device = await Device.connect(config=config_with_auth)
-                await device.update()
                 logger.debug(f"Connected to {ip} with credentials")
                 return device, None
             except Exception as e:
-                if device:
-                    await device.disconnect()
-                last_error = f"{type(e).__name__}: {e}"
+                last_error = e
+                if not _is_transient(e):
+                    break
                 if attempt < CONNECTION_RETRIES - 1:
                     logger.debug(
                         f"Connection to {ip} with auth failed (attempt {attempt + 1}): {e}"
                     )
-                    await asyncio.sleep(RETRY_DELAY)
+                    await asyncio.sleep(RETRY_DELAY * 2**attempt)
 
-    return None, last_error
+    if last_error is None:
+        return None, None
+    return None, f"{type(last_error).__name__}: {last_error}"
 
 
-async def discover_device_ip(device_info: KasaDeviceConfig) -> str | None:
-    """Discover a single device's current IP via broadcast."""
-    target_mac = device_info.mac
-    found_ip: str | None = None
+async def _broadcast(target: str) -> dict[str, str]:
+    """Run one Discover.discover sweep on target; return every responding MAC -> IP."""
+    seen: dict[str, str] = {}
 
     async def on_discovered(device: Device) -> None:
-        nonlocal found_ip
         device_mac = getattr(device, "mac", None)
         if device_mac:
             try:
-                if normalize_mac(device_mac) == target_mac:
-                    found_ip = device.host
-                    logger.info(f"Discovered {target_mac} at {found_ip}")
+                mac = normalize_mac(device_mac)
             except ValueError:
                 pass
-        try:
+            else:
+                seen[mac] = device.host
+                for listener in _listeners.get(target, ()):
+                    listener(mac, device.host)
+        with contextlib.suppress(Exception):
             await device.disconnect()
-        except Exception:
-            pass
 
-    await Discover.discover(target=device_info.broadcast, on_discovered=on_discovered)
+    try:
+        await Discover.discover(target=target, on_discovered=on_discovered)
+    finally:
+        _inflight.pop(target, None)
+
+    now = time.monotonic()
+    for mac, ip in seen.items():
+        _discovery_cache[mac] = (ip, now)
+    return seen
+
+
+async def _shared_broadcast(
+    target: str, on_seen: Callable[[str, str], None] | None = None
+) -> dict[str, str]:
+    """Join the sweep already running on target, or start one.
+
+    on_seen is called with (mac, ip) for responses that arrive after joining.
+    """
+    task = _inflight.get(target)
+    if task is None:
+        task = asyncio.create_task(_broadcast(target))
+        _inflight[target] = task
+    if on_seen is not None:
+        _listeners[target].append(on_seen)
+    try:
+        # Shielded so one cancelled caller cannot abort the sweep others are waiting on.
+        return await asyncio.shield(task)
+    finally:
+        if on_seen is not None:
+            _listeners[target].remove(on_seen)
+
+
+async def _await_mac(target: str, mac: str) -> str | None:
+    """Return mac's IP from a sweep on target as soon as it answers, not when the sweep ends."""
+    answered: asyncio.Future[str] = asyncio.get_running_loop().create_future()
+
+    def on_seen(seen_mac: str, ip: str) -> None:
+        if seen_mac == mac and not answered.done():
+            answered.set_result(ip)
+
+    sweep = asyncio.create_task(_shared_broadcast(target, on_seen=on_seen))
+    try:
+        await asyncio.wait((sweep, answered), return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        # Only detaches this caller; the shielded sweep keeps running and caching for others.
+        sweep.cancel()
+    if answered.done():
+        return answered.result()
+    return sweep.result().get(mac)
+
+
+async def _answers_at(ip: str, mac: str) -> bool:
+    """Unicast a discovery probe to ip; True if the device there has this MAC."""
+    try:
+        device = await Discover.discover_single(ip, discovery_timeout=UNICAST_TIMEOUT)
+    except (KasaException, TimeoutError, OSError):
+        return False
+    if device is None:
+        return False
+    try:
+        return normalize_mac(device.mac) == mac
+    except ValueError:
+        return False
+    finally:
+        with contextlib.suppress(Exception):
+            await device.disconnect()
+
+
+async def discover_device_ip(
+    device_info: KasaDeviceConfig, last_ip: str | None = None, use_cache: bool = True
+) -> str | None:
+    """Discover a single device's current IP, trying last_ip by unicast before broadcasting.
+
+    use_cache=False skips both the discovery cache and the last_ip probe and always
+    broadcasts, for callers that already suspect the remembered address.
+    """
+    target_mac = device_info.mac
+    entry = _discovery_cache.get(target_mac) if use_cache else None
+    if entry:
+        cached_ip, stored_at = entry
+        ttl = DISCOVERY_POSITIVE_TTL if cached_ip else DISCOVERY_NEGATIVE_TTL
+        if time.monotonic() - stored_at < ttl:
+            logger.debug(f"Discovery cache hit for {target_mac}: {cached_ip}")
+            return cached_ip
+
+    # A device that only dropped a TCP connection still answers discovery at its old
+    # address; checking that costs one datagram instead of a LAN-wide sweep.
+    if use_cache and last_ip and await _answers_at(last_ip, target_mac):
+        logger.debug(f"{target_mac} still answers at {last_ip}")
+        _discovery_cache[target_mac] = (last_ip, time.monotonic())
+        return last_ip
+
+    found_ip = await _await_mac(device_info.broadcast, target_mac)
+    # Cached here too: on an early return the sweep has not written its results yet.
+    _discovery_cache[target_mac] = (found_ip, time.monotonic())
+    if found_ip:
+        logger.info(f"Discovered {target_mac} at {found_ip}")
     return found_ip
 
 
-async def discover_all(known_devices: dict[str, KasaDeviceConfig]) -> dict[str, str]:
-    """Discover known devices on the network. Returns MAC -> IP."""
+async def close_discovery() -> None:
+    """Cancel sweeps still running on shutdown; callers that gave up leave them shielded."""
+    tasks = list(_inflight.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def invalidate_discovery(mac: str) -> None:
+    """Forget the cached discovery result for mac, e.g. after its IP stopped answering."""
+    _discovery_cache.pop(mac, None)
+
+
+async def _discover_on_target(
+    target: str,
+    devices: list[KasaDeviceConfig],
+    on_found: Callable[[str, str], None] | None,
+) -> dict[str, str]:
+    """Broadcast on target; return MAC -> IP for the given devices."""
+    logger.info(f"Discovering on {target}...")
+    wanted = {device.mac: device for device in devices}
+    found: dict[str, str] = {}
+
+    def record(mac: str, ip: str) -> None:
+        device = wanted.get(mac)
+        if device is None or mac in found:
+            return
+        found[mac] = ip
+        logger.info(f"Found device: {device.name} at {ip}")
+        if on_found:
+            on_found(mac, ip)
+
+    # No pause between passes: each sweep already listens for its full discovery timeout,
+    # which is far longer than a busy device needs before it can answer again.
+    for attempt in range(DISCOVERY_ATTEMPTS):
+        seen = await _shared_broadcast(target, on_seen=record)
+        # Responses that arrived before we joined a sweep already in progress.
+        for mac, ip in seen.items():
+            record(mac, ip)
+        if len(found) == len(wanted):
+            break
+        if attempt < DISCOVERY_ATTEMPTS - 1:
+            logger.debug(
+                f"{target}: {len(found)}/{len(wanted)} devices answered, sweeping again"
+            )
+    return found
+
+
+async def discover_all(
+    known_devices: dict[str, KasaDeviceConfig],
+    on_found: Callable[[str, str], None] | None = None,
+) -> dict[str, str]:
+    """Discover known devices on the network. Returns MAC -> IP.
+
+    on_found, if given, is called once per found device as soon as it answers, so
+    callers can start work on it while the sweep is still listening.
+    """
     logger.info("Starting Kasa device discovery...")
 
-    targets: dict[str, list[KasaDeviceConfig]] = {}
+    targets: dict[str, list[KasaDeviceConfig]] = defaultdict(list)
     for info in known_devices.values():
-        targets.setdefault(info.broadcast, []).append(info)
+        targets[info.broadcast].append(info)
 
+    # Each broadcast waits out its own discovery timeout, so run them side by side.
+    parts = await asyncio.gather(
+        *(
+            _discover_on_target(target, devices, on_found)
+            for target, devices in targets.items()
+        )
+    )
     result: dict[str, str] = {}
-
-    for target, devices in targets.items():
-        logger.info(f"Discovering on {target}...")
-        device_macs = {d.mac for d in devices}
-
-        async def on_discovered(device: Device) -> None:
-            device_mac = getattr(device, "mac", None)
-            if device_mac:
-                try:
-                    mac = normalize_mac(device_mac)
-                    if mac in device_macs:
-                        result[mac] = device.host
-                        logger.info(f"Found device: {known_devices[mac].name} at {device.host}")
-                except ValueError:
-                    pass
-            try:
-                await device.disconnect()
-            except Exception:
-                pass
-
-        await Discover.discover(target=target, on_discovered=on_discovered)
+    for part in parts:
+        result.update(part)
 
     logger.info(f"Kasa discovery complete: {len(result)}/{len(known_devices)} devices found")
     return result
@@ -136,11 +336,8 @@ async def discover_all(known_devices: dict[str, KasaDeviceConfig]) -> dict[str,
 def build_device_state(device_info: KasaDeviceConfig, kasa_device: Device) -> DeviceState:
     """Build an online DeviceState from a connected Kasa Device object."""
     children: tuple[ChildState, ...] | None = None
-    if hasattr(kasa_device, "children") and kasa_device.children:
-        children = tuple(
-            ChildState(id=child.device_id, alias=child.alias, is_on=child.is_on)
-            for child in kasa_device.children
-        )
+    if kasa_device.children:
+        children = tuple(ChildState(*_child_fields(child)) for child in kasa_device.children)
 
     return DeviceState(
         id=device_info.id,
@@ -149,5 +346,5 @@ def build_device_state(device_info: KasaDeviceConfig, kasa_device: Device) -> De
         alias=kasa_device.alias,
         model=kasa_device.model,
         children=children,
-        last_updated=datetime.now(timezone.utc),
+        last_updated=utc_now(),
     )
@@ -1,17 +1,18 @@
 """SmartPlug Hub - FastAPI backend with per-device command queue and multi-protocol support."""
 
 import asyncio
+import hashlib
 import logging
 import os
 from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import Depends, FastAPI, HTTPException
-from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 
 from .device_manager import DeviceManager
-from .core.exceptions import DeviceOfflineError, DeviceOperationError
+from .core.exceptions import DeviceOfflineError, DeviceOperationError, DeviceTimeoutError
 from .core.models import DeviceStatus
 from .schemas import ControlRequest, DeviceListResponse, DeviceResponse, ErrorDetail
 
@@ -24,14 +25,53 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 device_manager: DeviceManager | None = None
+# (body, ETag) of static/index.html, read once at startup
+_index_page: tuple[bytes, str] | None = None
 
 
 def _err(error: str, message: str) -> dict:
     return ErrorDetail(error=error, message=message).model_dump()
 
 
+# (manager, state_version, serialized DeviceListResponse, ETag), shared by the list endpoint
+# and SSE. The manager is part of the key: a new one restarts state_version at 0.
+_device_list_cache: tuple[DeviceManager, int, str, str] | None = None
+
+
+def _device_list_entry(dm: DeviceManager) -> tuple[str, str]:
+    """(JSON, ETag) of the device list, rebuilt only after a state change."""
+    global _device_list_cache
+    version = dm.state_version
+    cached = _device_list_cache
+    if cached is None or cached[0] is not dm or cached[1] != version:
+        payload = DeviceListResponse(
+            devices=[DeviceResponse.from_device(d) for d in dm.get_all_devices()]
+        ).model_dump_json()
+        # Hashed rather than the bare version, which restarts at 0 with the process and
+        # would let a browser's ETag from before a restart match different content.
+        etag = f'"{hashlib.blake2b(payload.encode(), digest_size=8).hexdigest()}"'
+        cached = _device_list_cache = (dm, version, payload, etag)
+    return cached[2], cached[3]
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """True if an If-None-Match header covers etag, using weak comparison as RFC 9110 asks."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Proxies and compression middleware weaken tags to W/"...", and clients may send a list.
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def _device_list_json(dm: DeviceManager) -> str:
+    """Serialized list of all devices, rebuilt only after a state change."""
+    return _device_list_entry(dm)[0]
+
+
 # === Dependency ===
-def get_device_manager() -> DeviceManager:
+# async so FastAPI calls it inline; a plain def dependency is dispatched to the threadpool.
+async def get_device_manager() -> DeviceManager:
     if not device_manager:
         raise HTTPException(
             status_code=503,
@@ -43,9 +83,10 @@ def get_device_manager() -> DeviceManager:
 # === Lifecycle ===
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global device_manager
+    global device_manager, _index_page
 
     logger.info("Starting SmartPlug Hub...")
+    _index_page = await asyncio.to_thread(_load_index_page)
     device_manager = DeviceManager()
     await device_manager.initialize()
 
@@ -64,20 +105,47 @@ app = FastAPI(
 )
 
 
+# === Error Handlers ===
+# Device errors map to the same status from every endpoint, so they are translated once
+# here; ValueError stays with each endpoint since it means 404 or 400 depending on the route.
+def _error_response(status_code: int, error: str, exc: Exception) -> JSONResponse:
+    return JSONResponse(status_code=status_code, content={"detail": _err(error, str(exc))})
+
+
+@app.exception_handler(DeviceOfflineError)
+async def _offline_handler(request: Request, exc: DeviceOfflineError) -> JSONResponse:
+    return _error_response(503, "offline", exc)
+
+
+@app.exception_handler(DeviceTimeoutError)
+async def _timeout_handler(request: Request, exc: DeviceTimeoutError) -> JSONResponse:
+    return _error_response(504, "timeout", exc)
+
+
+@app.exception_handler(DeviceOperationError)
+async def _operation_handler(request: Request, exc: DeviceOperationError) -> JSONResponse:
+    return _error_response(502, "operation_failed", exc)
+
+
 # === API v1 Endpoints ===
 @app.get("/api/v1/devices", response_model=DeviceListResponse)
-def list_devices(dm: DeviceManager = Depends(get_device_manager)):
-    """Get cached status of all devices (zero I/O)."""
-    return DeviceListResponse(devices=[DeviceResponse.from_device(d) for d in dm.get_all_devices()])
+async def list_devices(request: Request, dm: DeviceManager = Depends(get_device_manager)):
+    """Get cached status of all devices (zero I/O); 304 if unchanged since the client's copy."""
+    payload, etag = _device_list_entry(dm)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=payload, media_type="application/json", headers=headers)
 
 
 @app.get("/api/v1/devices/{device_id}", response_model=DeviceResponse)
-def get_device(device_id: str, dm: DeviceManager = Depends(get_device_manager)):
-    """Get a single device's cached status."""
+async def get_device(device_id: str, dm: DeviceManager = Depends(get_device_manager)):
+    """Get a single device's cached status, refreshing it in the background when stale."""
     try:
-        return DeviceResponse.from_device(dm.get_device(device_id))
+        device = dm.get_device(device_id, revalidate=True)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=_err("not_found", str(e)))
+    return Response(content=DeviceResponse.json_for(device), media_type="application/json")
 
 
 @app.patch("/api/v1/devices/{device_id}", response_model=DeviceResponse)
@@ -93,12 +161,6 @@ async def control_device(
         return DeviceResponse.from_device(dm.get_device(device_id))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=_err("invalid_request", str(e)))
-    except DeviceOfflineError as e:
-        raise HTTPException(status_code=503, detail=_err("offline", str(e)))
-    except DeviceOperationError as e:
-        if "timed out" in str(e).lower():
-            raise HTTPException(status_code=504, detail=_err("timeout", str(e)))
-        raise HTTPException(status_code=502, detail=_err("operation_failed", str(e)))
 
 
 @app.post("/api/v1/devices/{device_id}/refresh")
@@ -126,18 +188,13 @@ async def device_events(dm: DeviceManager = Depends(get_device_manager)):
     """SSE stream: push on state change, heartbeat comment when idle."""
     q = dm.subscribe()
 
-    def _snapshot() -> str:
-        return DeviceListResponse(
-            devices=[DeviceResponse.from_device(d) for d in dm.get_all_devices()]
-        ).model_dump_json()
-
     async def generator():
         try:
-            yield f"data: {_snapshot()}\n\n"
+            yield f"data: {_device_list_json(dm)}\n\n"
             while True:
                 try:
                     await asyncio.wait_for(q.get(), timeout=_SSE_HEARTBEAT)
-                    yield f"data: {_snapshot()}\n\n"
+                    yield f"data: {_device_list_json(dm)}\n\n"
                 except asyncio.TimeoutError:
                     yield ": heartbeat\n\n"
         finally:
@@ -154,6 +211,20 @@ async def device_events(dm: DeviceManager = Depends(get_device_manager)):
 app.mount("/static", StaticFiles(directory=PROJECT_ROOT / "static"), name="static")
 
 
+def _load_index_page() -> tuple[bytes, str]:
+    body = (PROJECT_ROOT / "static/index.html").read_bytes()
+    return body, f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+
 @app.get("/")
-async def root():
-    return FileResponse(PROJECT_ROOT / "static/index.html")
+async def root(request: Request):
+    if _index_page is None:
+        raise HTTPException(
+            status_code=503, detail=_err("service_unavailable", "Index page not loaded")
+        )
+    body, etag = _index_page
+    # no-cache: browsers revalidate every load, which costs a 304 while the page is unchanged.
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="text/html", headers=headers)
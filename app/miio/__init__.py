@@ -2,6 +2,6 @@
 
 from .backend import MiioBackend
 from .config import MiioDeviceConfig, parse_config
-from .connection import discover_all
+from .connection import close_discovery, discover_all
 
-__all__ = ["MiioBackend", "MiioDeviceConfig", "parse_config", "discover_all"]
+__all__ = ["MiioBackend", "MiioDeviceConfig", "parse_config", "discover_all", "close_discovery"]
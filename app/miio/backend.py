@@ -32,8 +32,11 @@ class MiioBackend(DeviceBackend[MiioDeviceConfig]):
             return state
         return None
 
-    async def find_ip(self, cfg: MiioDeviceConfig) -> str | None:
-        results = await connection.discover_all({cfg.mac: cfg})
+    async def find_ip(self, cfg: MiioDeviceConfig, use_cache: bool = True) -> str | None:
+        # MiIO keeps no discovery cache, so every lookup is already a fresh broadcast.
+        # One sweep: a user-triggered refresh should not block for every re-sweep of an
+        # unplugged device; the background discovery loop retries it anyway.
+        results = await connection.discover_all({cfg.mac: cfg}, attempts=1)
         ip = results.get(cfg.mac)
         if ip:
             self.ip = ip
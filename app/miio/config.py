@@ -5,7 +5,7 @@ from dataclasses import dataclass
 from ..core.models import DeviceInfo
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class MiioDeviceConfig(DeviceInfo):
     broadcast: str = ""
     token: str = ""
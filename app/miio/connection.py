@@ -3,15 +3,15 @@
 import asyncio
 import logging
 import re
-import socket
-import time
-from datetime import datetime, timezone
+from collections import defaultdict
+from collections.abc import Callable
 from functools import partial
 
 from miio.protocol import Message
 
 from ..core.exceptions import DeviceOfflineError
 from ..core.models import ChildState, DeviceState, DeviceStatus, make_offline_state
+from ..core.utils import utc_now
 from .config import MiioDeviceConfig
 
 logger = logging.getLogger(__name__)
@@ -19,6 +19,8 @@ logger = logging.getLogger(__name__)
 TOKEN_RE = re.compile(r'^[0-9a-fA-F]{32}$')
 
 _MIIO_PORT = 54321
+DISCOVERY_ATTEMPTS = 3  # hello replies are UDP and get dropped; re-sweep for the missing
+DISCOVERY_IDLE_TIMEOUT = 60.0  # seconds to keep the shared discovery socket open
 # Standard MiIO UDP hello packet (32 bytes, all-ones placeholder fields)
 _HELLO = bytes.fromhex('21310020' + 'ff' * 28)
 
@@ -28,56 +30,176 @@ _OUTLET_SIIDS = [3, 4, 5, 6, 7, 8]   # outlets 1–6
 _USB_SIID = 9
 _MAIN_SIID = 2
 _CHILD_IDS = ["1", "2", "3", "4", "5", "6", "usb"]
-
-
-def _udp_discover_sync(broadcast: str, timeout: float) -> dict[str, str]:
-    """Send MiIO hello to broadcast; return {miio_id: ip} for all responders."""
-    found: dict[str, str] = {}
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    try:
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-        sock.settimeout(timeout)
-        sock.sendto(_HELLO, (broadcast, _MIIO_PORT))
-        deadline = time.monotonic() + timeout
-        while time.monotonic() < deadline:
-            try:
-                data, addr = sock.recvfrom(1024)
+_CHILD_SIIDS = {**dict(zip(_CHILD_IDS, _OUTLET_SIIDS)), "usb": _USB_SIID}
+_CHILD_ALIASES = {child_id: f"Outlet {child_id}" for child_id in _CHILD_IDS[:6]} | {"usb": "USB"}
+
+
+class _DiscoveryProtocol(asyncio.DatagramProtocol):
+    """Decodes hello replies and fans them out to every active collector."""
+
+    def __init__(self) -> None:
+        self.collectors: list[Callable[[str, str], None]] = []
+
+    def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
+        try:
+            m = Message.parse(data)
+            did = str(int.from_bytes(m.header.value.device_id, byteorder="big"))
+        except Exception:
+            return  # skip malformed packets
+        for collect in self.collectors:
+            collect(did, addr[0])
+
+    def error_received(self, exc: Exception) -> None:
+        logger.warning(f"MiIO discovery socket error: {exc}")
+
+
+class _DiscoveryEndpoint:
+    """One broadcast UDP socket shared by all discoveries, closed after an idle period."""
+
+    def __init__(self) -> None:
+        self._transport: asyncio.DatagramTransport | None = None
+        self._protocol: _DiscoveryProtocol | None = None
+        self._idle_handle: asyncio.TimerHandle | None = None
+        # Held while the socket is created, so concurrent sweeps cannot each open one
+        # and orphan all but the last.
+        self._open_lock = asyncio.Lock()
+        self._active = 0
+        # Broadcast address -> sweep in progress, shared by concurrent callers
+        self._inflight: dict[str, asyncio.Task[dict[str, str]]] = {}
+        # Broadcast address -> callbacks told (miio_id, ip) as replies arrive
+        self._listeners: dict[str, list[Callable[[str, str], None]]] = defaultdict(list)
+
+    async def discover(
+        self,
+        broadcast: str,
+        timeout: float,
+        on_seen: Callable[[str, str], None] | None = None,
+    ) -> dict[str, str]:
+        """Send MiIO hello to broadcast, or join the sweep already running there.
+
+        on_seen is called with (miio_id, ip) for replies that arrive after joining.
+        """
+        task = self._inflight.get(broadcast)
+        if task is None:
+            task = asyncio.create_task(self._sweep(broadcast, timeout))
+            self._inflight[broadcast] = task
+            task.add_done_callback(lambda _: self._inflight.pop(broadcast, None))
+        if on_seen is not None:
+            self._listeners[broadcast].append(on_seen)
+        try:
+            # Shielded so one cancelled caller cannot abort the sweep others are waiting on.
+            return await asyncio.shield(task)
+        finally:
+            if on_seen is not None:
+                self._listeners[broadcast].remove(on_seen)
+
+    async def _sweep(self, broadcast: str, timeout: float) -> dict[str, str]:
+        """Send MiIO hello to broadcast; return {miio_id: ip} for all responders."""
+        loop = asyncio.get_running_loop()
+        if self._idle_handle:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+        async with self._open_lock:
+            if self._transport is None or self._transport.is_closing():
                 try:
-                    m = Message.parse(data)
-                    did = str(int.from_bytes(m.header.value.device_id, byteorder="big"))
-                    found[did] = addr[0]
-                except Exception:
-                    pass  # skip malformed packets
-            except socket.timeout:
-                break
-    except OSError as e:
-        logger.warning(f"UDP discover on {broadcast} failed: {e}")
-    finally:
-        sock.close()
-    return found
+                    self._transport, self._protocol = await loop.create_datagram_endpoint(
+                        _DiscoveryProtocol, local_addr=("0.0.0.0", 0), allow_broadcast=True
+                    )
+                except OSError as e:
+                    logger.warning(f"UDP discover on {broadcast} failed: {e}")
+                    return {}
+
+        found: dict[str, str] = {}
+        listeners = self._listeners[broadcast]
+
+        def collect(did: str, ip: str) -> None:
+            if did in found:
+                return  # devices often answer a hello more than once
+            found[did] = ip
+            for listener in listeners:
+                listener(did, ip)
+
+        protocol = self._protocol
+        protocol.collectors.append(collect)
+        self._active += 1
+        try:
+            self._transport.sendto(_HELLO, (broadcast, _MIIO_PORT))
+            await asyncio.sleep(timeout)
+        finally:
+            protocol.collectors.remove(collect)
+            self._active -= 1
+            if not self._active:
+                self._idle_handle = loop.call_later(DISCOVERY_IDLE_TIMEOUT, self.close)
+        return found
+
+    async def shutdown(self) -> None:
+        """Cancel sweeps still in progress, wait for them, then close the socket."""
+        tasks = list(self._inflight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.close()
+
+    def close(self) -> None:
+        if self._idle_handle:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+        if self._transport:
+            self._transport.close()
+            self._transport = None
+            self._protocol = None
+
+
+_discovery_endpoint = _DiscoveryEndpoint()
+
+
+async def close_discovery() -> None:
+    """Stop running sweeps and close the shared socket now instead of after its idle timeout."""
+    await _discovery_endpoint.shutdown()
 
 
 async def discover_all(
-    whitelist: dict[str, MiioDeviceConfig], timeout: float = 3.0
+    whitelist: dict[str, MiioDeviceConfig],
+    on_found: Callable[[str, str], None] | None = None,
+    timeout: float = 3.0,
+    attempts: int = DISCOVERY_ATTEMPTS,
 ) -> dict[str, str]:
-    """Broadcast UDP discover per unique broadcast address; return MAC→IP map."""
-    by_broadcast: dict[str, list[MiioDeviceConfig]] = {}
+    """Broadcast UDP discover per unique broadcast address; return MAC→IP map.
+
+    on_found, if given, is called with (mac, ip) once per found device as soon as it
+    answers, so callers can start work on it while the sweep is still listening.
+    attempts caps the sweeps per address for devices that have not answered yet.
+    """
+    by_broadcast: dict[str, list[MiioDeviceConfig]] = defaultdict(list)
     for cfg in whitelist.values():
-        by_broadcast.setdefault(cfg.broadcast, []).append(cfg)
+        by_broadcast[cfg.broadcast].append(cfg)
 
-    loop = asyncio.get_running_loop()
     ip_map: dict[str, str] = {}
 
-    for broadcast, cfgs in by_broadcast.items():
+    async def sweep(broadcast: str, cfgs: list[MiioDeviceConfig]) -> None:
+        by_id = {cfg.miio_id: cfg for cfg in cfgs}
+
+        def record(miio_id: str, ip: str) -> None:
+            cfg = by_id.get(miio_id)
+            if cfg is None or cfg.mac in ip_map:
+                return
+            ip_map[cfg.mac] = ip
+            logger.info(f"Discovered {cfg.name} at {ip}")
+            if on_found:
+                on_found(cfg.mac, ip)
+
         logger.info(f"MiIO discovering on {broadcast}...")
-        discovered = await loop.run_in_executor(
-            None, partial(_udp_discover_sync, broadcast, timeout)
-        )
-        for cfg in cfgs:
-            if cfg.miio_id in discovered:
-                ip = discovered[cfg.miio_id]
-                ip_map[cfg.mac] = ip
-                logger.info(f"Discovered {cfg.name} at {ip}")
+        # No pause between passes: each sweep already listens for the full timeout.
+        for _ in range(attempts):
+            discovered = await _discovery_endpoint.discover(broadcast, timeout, on_seen=record)
+            # Replies that arrived before we joined a sweep already in progress.
+            for miio_id, ip in discovered.items():
+                record(miio_id, ip)
+            if all(cfg.mac in ip_map for cfg in cfgs):
+                break
+
+    # Each sweep waits out its full timeout, so run them side by side.
+    await asyncio.gather(*(sweep(broadcast, cfgs) for broadcast, cfgs in by_broadcast.items()))
 
     logger.info(f"MiIO discovery complete: {len(ip_map)}/{len(whitelist)} devices found")
     return ip_map
@@ -102,28 +224,21 @@ def _fetch_status_sync(ip: str, cfg: MiioDeviceConfig) -> DeviceState:
         raise DeviceOfflineError(f"{cfg.name} unreachable: {e}") from e
 
     # results is a list of dicts: [{did, siid, piid, code, value}, ...]
-    values: dict[int, bool] = {}
-    for r in results:
-        if r.get("code") == 0:
-            values[r["siid"]] = bool(r["value"])
-
-    outlet_states = [values.get(siid, False) for siid in _OUTLET_SIIDS]
-    usb_state = values.get(_USB_SIID, False)
-
-    children = [
-        ChildState(id=child_id, alias=f"Outlet {child_id}", is_on=state)
-        for child_id, state in zip(_CHILD_IDS[:6], outlet_states)
-    ]
-    children.append(ChildState(id="usb", alias="USB", is_on=usb_state))
+    values = {r["siid"]: bool(r["value"]) for r in results if r.get("code") == 0}
+    # One walk over the fixed outlet layout builds every child, USB included.
+    children = tuple(
+        ChildState(id=child_id, alias=_CHILD_ALIASES[child_id], is_on=values.get(siid, False))
+        for child_id, siid in _CHILD_SIIDS.items()
+    )
 
     return DeviceState(
         id=cfg.id,
         status=DeviceStatus.ONLINE,
-        is_on=any(outlet_states) or usb_state,
+        is_on=any(child.is_on for child in children),
         alias=cfg.name,
         model="WP12",
-        children=tuple(children),
-        last_updated=datetime.now(timezone.utc),
+        children=children,
+        last_updated=utc_now(),
     )
 
 
@@ -151,12 +266,10 @@ def _set_power_sync(
 
     if child_id is None:
         siid = _MAIN_SIID
-    elif child_id in _CHILD_IDS[:6]:
-        siid = _OUTLET_SIIDS[_CHILD_IDS.index(child_id)]
-    elif child_id == "usb":
-        siid = _USB_SIID
     else:
-        raise DeviceOfflineError(f"{cfg.name}: unknown child_id '{child_id}'")
+        siid = _CHILD_SIIDS.get(child_id)
+        if siid is None:
+            raise DeviceOfflineError(f"{cfg.name}: unknown child_id '{child_id}'")
 
     device = MiotDevice(ip=ip, token=cfg.token)
     try:
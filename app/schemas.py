@@ -2,18 +2,23 @@
 
 from datetime import datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 from .core.models import Device
 
 
 class ChildResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     id: str
     alias: str | None
     is_on: bool
 
 
 class DeviceResponse(BaseModel):
+    # Frozen: from_device hands the same cached instance to every caller.
+    model_config = ConfigDict(frozen=True)
+
     id: str
     name: str
     type: str
@@ -23,14 +28,19 @@ class DeviceResponse(BaseModel):
     alias: str | None
     model: str | None
     is_strip: bool
-    children: list[ChildResponse] | None
+    children: tuple[ChildResponse, ...] | None
     last_updated: datetime | None
 
     @classmethod
     def from_device(cls, device: Device) -> 'DeviceResponse':
         info = device.info
         state = device.state
-        return cls(
+        # DeviceState is frozen and replaced on every change, so an identity match means the
+        # cached response is still current.
+        cached = device.response_cache
+        if cached is not None and cached[0] is state:
+            return cached[1]
+        response = cls(
             id=state.id,
             name=info.name,
             type=info.type,
@@ -40,10 +50,24 @@ class DeviceResponse(BaseModel):
             alias=state.alias,
             model=state.model,
             is_strip=state.is_strip,
-            children=[ChildResponse(id=c.id, alias=c.alias, is_on=c.is_on) for c in state.children]
+            children=tuple(
+                ChildResponse(id=c.id, alias=c.alias, is_on=c.is_on) for c in state.children
+            )
             if state.children else None,
             last_updated=state.last_updated,
         )
+        device.response_cache = (state, response, None)
+        return response
+
+    @classmethod
+    def json_for(cls, device: Device) -> str:
+        """Serialized from_device(device), cached with the response until the state changes."""
+        response = cls.from_device(device)
+        state, _, payload = device.response_cache
+        if payload is None:
+            payload = response.model_dump_json()
+            device.response_cache = (state, response, payload)
+        return payload
 
 
 class DeviceListResponse(BaseModel):
@@ -51,6 +75,9 @@ class DeviceListResponse(BaseModel):
 
 
 class ControlRequest(BaseModel):
+    # strict: the UI sends JSON booleans, so skip lax coercion of "yes"/1/"on" and friends.
+    model_config = ConfigDict(extra="forbid", strict=True)
+
     is_on: bool
     child_id: str | None = None
 
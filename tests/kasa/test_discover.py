@@ -54,8 +54,9 @@ async def discover_devices(raw: bool = False, broadcast: str | None = None) -> N
         discover_kwargs['target'] = broadcast
     found_devices = await Discover.discover(**discover_kwargs)
     print(f"\nDiscovery complete. Found {device_count} device(s).")
-    for device in found_devices.values():
-        await device.disconnect()
+    await asyncio.gather(
+        *(device.disconnect() for device in found_devices.values()), return_exceptions=True
+    )
 
 
 if __name__ == "__main__":
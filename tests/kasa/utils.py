@@ -1,5 +1,6 @@
 """Shared helpers for Kasa integration scripts."""
 
+import functools
 import os
 from pathlib import Path
 
@@ -7,6 +8,7 @@ from dotenv import load_dotenv
 from kasa import Credentials, Device
 
 _ENV_PATH = Path(__file__).parent.parent.parent / "config" / ".env"
+_MAC_SEPARATORS = str.maketrans("", "", "-:.")
 
 
 def load_credentials() -> Credentials | None:
@@ -20,9 +22,10 @@ def load_credentials() -> Credentials | None:
     return Credentials(username=username, password=password)
 
 
+@functools.lru_cache(maxsize=256)
 def normalize_mac(mac: str) -> str:
-    clean = mac.upper().replace("-", "").replace(":", "").replace(".", "")
-    return ":".join(clean[i:i + 2] for i in range(0, 12, 2))
+    clean = mac.translate(_MAC_SEPARATORS).upper()
+    return f"{clean[0:2]}:{clean[2:4]}:{clean[4:6]}:{clean[6:8]}:{clean[8:10]}:{clean[10:12]}"
 
 
 def print_device_info(device: Device) -> None: